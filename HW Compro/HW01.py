@@ -1,8 +1,11 @@
+_SPACE_TO_DASH = str.maketrans(' ', '-')
+
+
 def format_strings(*args):
     if len(args) == 1:
-        result = args[0].replace(' ', '-')
+        result = args[0].translate(_SPACE_TO_DASH)
     else:
-        result = '-'.join(args)
+        result = ''.join(args)
     result = result.upper()
     return result
 
@@ -1,3 +1,17 @@
+from collections import deque
+
+DIR_TABLE = [None] * 128
+DIR_TABLE[ord('>')] = (0, 1)
+DIR_TABLE[ord('<')] = (0, -1)
+DIR_TABLE[ord('v')] = (1, 0)
+DIR_TABLE[ord('^')] = (-1, 0)
+
+
+def conveyor_direction(cell):
+    code = ord(cell)
+    return DIR_TABLE[code] if code < len(DIR_TABLE) else None
+
+
 def maze_solver_with_conveyors(maze):
     rows, cols = len(maze), len(maze[0])
     
@@ -12,49 +26,95 @@ def maze_solver_with_conveyors(maze):
     if not start or not end:
         return {"distance": -1, "path": []}
     
-    directions = {
-        '>': (0, 1),
-        '<': (0, -1),
-        'v': (1, 0),
-        '^': (-1, 0),
-    }
-
     def in_bounds(r, c):
         return 0 <= r < rows and 0 <= c < cols and maze[r][c] != '#'
-    
-    q = [(start[0], start[1], 0, [list(start)])]
-    visited = set([start])
+
+    # landing[conveyor cell] = (cell the ride stops on, number of cells passed after the conveyor cell)
+    # built back-to-front from the next cell's entry; None marks cells on the chain being walked,
+    # so a conveyor loop is found when the walk reaches one of them and each loop cell stops
+    # right before the ride would repeat a cell (on the loop cell just before it)
+    landing = {}
+    for r in range(rows):
+        for c in range(cols):
+            if (r, c) in landing or conveyor_direction(maze[r][c]) is None:
+                continue
+            chain = []
+            cr, cc = r, c
+            while True:
+                landing[(cr, cc)] = None
+                chain.append((cr, cc))
+                dr2, dc2 = conveyor_direction(maze[cr][cc])
+                nr2, nc2 = cr + dr2, cc + dc2
+                if not in_bounds(nr2, nc2):
+                    landing[(cr, cc)] = ((cr, cc), 0)
+                    break
+                if (nr2, nc2) in landing:
+                    if landing[(nr2, nc2)] is None:
+                        loop_start = chain.index((nr2, nc2))
+                        loop_len = len(chain) - loop_start
+                        for i in range(loop_start, len(chain)):
+                            landing[chain[i]] = (chain[i - 1] if i > loop_start else chain[-1], loop_len - 1)
+                        chain = chain[:loop_start + 1]
+                    else:
+                        cell, steps = landing[(nr2, nc2)]
+                        landing[(cr, cc)] = (cell, steps + 1)
+                    break
+                if conveyor_direction(maze[nr2][nc2]) is None:
+                    landing[(cr, cc)] = ((nr2, nc2), 1)
+                    break
+                cr, cc = nr2, nc2
+            for i in range(len(chain) - 2, -1, -1):
+                cell, steps = landing[chain[i + 1]]
+                landing[chain[i]] = (cell, steps + 1)
+
+    def ride_cells(cell):
+        # walk DIR_TABLE from the entry cell for as many cells as its ride passes
+        r, c = cell
+        cells = [(r, c)]
+        steps = landing[cell][1] if cell in landing else 0
+        for _ in range(steps):
+            dr, dc = DIR_TABLE[ord(maze[r][c])]
+            r, c = r + dr, c + dc
+            cells.append((r, c))
+        return cells
+
+    def trace_path(cell, entry):
+        segments = [ride_cells(entry)] if entry is not None else []
+        while parent[cell] is not None:
+            cell, prev_entry = parent[cell]
+            segments.append(ride_cells(prev_entry))
+        path = [list(start)]
+        for segment in reversed(segments):
+            path.extend([r, c] for r, c in segment)
+        return path
+
+    # parent[landing cell] = (cell we came from, cell where the step (and any conveyor ride) began)
+    q = deque([(start[0], start[1], 0)])
+    parent = {start: None}
+    visited = bytearray(rows * cols)
+    visited[start[0] * cols + start[1]] = 1
     
     while q:
-        r, c, dist, path = q.pop(0)
+        r, c, dist = q.popleft()
 
         if (r, c) == end:
-            return {"distance": dist, "path": path}
+            return {"distance": dist, "path": trace_path((r, c), None)}
 
         for dr, dc in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
             nr, nc = r + dr, c + dc
             if not in_bounds(nr, nc):
                 continue
-            if (nr, nc) in visited:
+            if visited[nr * cols + nc]:
                 continue
 
-            temp_path = path.copy()
-            temp_path.append([nr, nc])
-            cr, cc = nr, nc
-            
-            while maze[cr][cc] in directions:
-                dr2, dc2 = directions[maze[cr][cc]]
-                nr2, nc2 = cr + dr2, cc + dc2
-                if not in_bounds(nr2, nc2):
-                    break
-                cr, cc = nr2, nc2
-                temp_path.append([cr, cc])
-                if (cr, cc) == end:
-                    return {"distance": dist + 1, "path": temp_path}
+            (cr, cc), steps = landing.get((nr, nc), ((nr, nc), 0))
+            if steps and (cr, cc) == end:
+                return {"distance": dist + 1, "path": trace_path((r, c), (nr, nc))}
             
-            if (cr, cc) not in visited:
-                visited.add((cr, cc))
-                q.append((cr, cc, dist + 1, temp_path))
+            if not visited[cr * cols + cc]:
+                visited[cr * cols + cc] = 1
+                parent[(cr, cc)] = ((r, c), (nr, nc))
+                q.append((cr, cc, dist + 1))
 
     return {"distance": -1, "path": []}
 
@@ -1,7 +1,13 @@
 import struct
 import os
+import sys
+import mmap
 import datetime
-from typing import Dict, Any, Tuple, Optional, List
+import functools
+import heapq
+from collections import Counter
+from itertools import chain
+from typing import AbstractSet, Dict, Any, Tuple, Optional, List, Iterator, NamedTuple, TypeVar, Generic
 
 # ==============================================================================
 # 1.Constants สำหรับ 3 Entities
@@ -21,18 +27,53 @@ CUSTOMER_ENCODING = 'utf-8'
 RENTAL_FORMAT = '< ?iiiiid' 
 RENTAL_FILE_NAME = 'rentals.bin'
 RENTAL_ENCODING = 'utf-8' 
+
+# Detailed Report: คอลัมน์ของตาราง "ALL CARS DETAIL" และ template ของแถว (ความกว้างต้องตรงกัน)
+DETAIL_FIELDS = [
+    ('Car ID', 6), ('Model', 20), ('Plate', 12), ('Rate', 10),
+    ('Status', 10), ('Rented', 8),
+    ('Cust ID', 8), ('Name', 30), ('Start Date', 10), ('End Date', 10)
+]
+DETAIL_ROW_FMT = "{:<6} | {:<20} | {:<12} | {:<10,.2f} | {:<10} | {:<8} | {:<8} | {:<30} | {:<10} | {:<10}\n"
+# คอลัมน์ Status..End Date ของรถที่ไม่ได้ถูกเช่า (รถที่ถูกเช่าจะสร้างจากสัญญาเช่าในรายงาน)
+_AVAILABLE_COLS = ("Available", "No", "", "", "", "")
+_DELETED_COLS = ("DELETED", "No", "", "", "", "")
+# เส้นคั่นและหัวรายงาน (รวม \n แล้ว) สร้างครั้งเดียวตอนโหลดโมดูล
+_SEP_EQ = "=" * 155 + "\n"
+_SEP_DASH = "-" * 155 + "\n"
+_REPORT_TITLE = "Detailed Rental Summary Report"
+_REPORT_HDR = f"{_SEP_EQ}{' ' * ((150 - len(_REPORT_TITLE)) // 2)}{_REPORT_TITLE}\n{_SEP_EQ}"
+_DETAIL_HDR = (
+    ' | '.join(f"{name:<{length}}" for name, length in DETAIL_FIELDS) + "\n"
+    + "-" * (sum(length for _, length in DETAIL_FIELDS) + len(DETAIL_FIELDS) * 3) + "\n"
+)
+
+# msync ข้อมูลที่แก้ไขลงดิสก์เมื่อสะสมเกินขนาดนี้ (หรือตอน close)
+WRITE_FLUSH_THRESHOLD = 64 * 1024
 # ==============================================================================
 # 2.Base Manager
 # ==============================================================================
 
-class FileManager:
+# ชนิด record (NamedTuple) ที่ Manager แต่ละตัวคืนออกมา: CarRecord / CustomerRecord / RentalRecord ในส่วนที่ 3
+RecordT = TypeVar('RecordT', bound=tuple)
+
+class FileManager(Generic[RecordT]):
     """คลาสจัดการไฟล์ไบนารีพื้นฐาน: จัดการการเข้าถึงไฟล์, Free Space, และ CRUD ตรรกะทั่วไป"""
+
+    # Struct ที่ไม่ขึ้นกับรูปแบบระเบียน สร้างครั้งเดียวและใช้ร่วมกันทุก Manager
+    _status_struct = struct.Struct('<?')
+    _deleted_flag = _status_struct.pack(False)
+    _header_struct = struct.Struct('<?i')  # (IsActive, ID) ที่ต้นทุกระเบียน
     
     def __init__(self, format_string: str, filename: str, encoding: str):
         self.format = format_string
         self.filename = filename
         self.encoding = encoding
-        self.record_size = struct.calcsize(format_string)
+        self._struct = struct.Struct(format_string)
+        self.record_size = self._struct.size
+        self._buf = bytearray(self.record_size)
+        # (IsActive, ID) + pad bytes ข้ามส่วนที่เหลือของระเบียน ใช้สแกน header ทั้งไฟล์ด้วย iter_unpack
+        self._scan_struct = struct.Struct(f'<?i{self.record_size - 5}x')
         
         try:
             self.file = open(self.filename, 'r+b')
@@ -40,22 +81,169 @@ class FileManager:
         except FileNotFoundError:
             self.file = open(self.filename, 'w+b') 
             print(f"File '{self.filename}' created and opened for R/W.")
-        self.file.seek(0, os.SEEK_SET)
+        self._fd = self.file.fileno()
+
+        # Memory-map ทั้งไฟล์ (ไฟล์ว่างยัง map ไม่ได้ จะ map ตอน append ครั้งแรก)
+        file_size = os.fstat(self._fd).st_size
+        self.mm: Optional[mmap.mmap] = (
+            mmap.mmap(self._fd, 0, access=mmap.ACCESS_WRITE) if file_size else None
+        )
+        # _end = ขนาดข้อมูลจริง; mmap อาจใหญ่กว่านี้เพราะขยายแบบทวีคูณ (ส่วนเกินเป็น \x00 และถูกตัดทิ้งตอน close)
+        self._end = file_size
+
+        # Free Space List + ID Index: สแกนไฟล์ครั้งเดียวตอนเปิด
+        # _free_offsets เก็บ offset ของระเบียนที่ถูก Soft Delete เป็น min-heap (ใช้ช่องที่อยู่ต้นไฟล์ที่สุดก่อน
+        # เหมือนการสแกนหาช่องว่างช่องแรกแบบเดิม), _id_index จับคู่ ID -> offset ของระเบียน Active
+        self._free_offsets: List[int] = []
+        self._id_index: Dict[int, int] = {}
+        # ID ที่มีระเบียน Active มากกว่าหนึ่งระเบียน (index ชี้ระเบียนแรกในไฟล์ เหมือนการสแกนหาแบบเดิม)
+        self._dup_ids = set()
+        self._scan_headers()
+
+        # Dirty Range: ช่วงไบต์ที่เขียนแล้วแต่ยังไม่ได้ flush (รวมเป็นช่วงเดียว flush ทีเดียว)
+        self._dirty_start: Optional[int] = None
+        self._dirty_end = 0
+        self._dirty_bytes = 0
+        # มีการเขียน/ขยายไฟล์ตั้งแต่ sync ครั้งล่าสุดหรือไม่ (ไม่มีก็ไม่ต้อง fsync)
+        self._unsynced = False
+
+    def sync(self):
+        """เขียนข้อมูลที่ค้างอยู่ลงดิสก์ (msync + fsync) ใช้เป็นจุด sync ตอนออกจากเมนูย่อย"""
+        if not self._unsynced:
+            return
+        if self.mm is not None:
+            self._maybe_flush(force=True)
+        os.fsync(self._fd)
+        self._unsynced = False
 
     def close(self):
-        """ปิดและซิงค์ไฟล์อย่างปลอดภัย (Exit Hook)"""
-        self.file.flush()
-        os.fsync(self.file.fileno())
+        """ปิดและซิงค์ไฟล์อย่างปลอดภัย (Exit Hook) เรียกซ้ำได้ ครั้งที่สองเป็นต้นไปไม่ทำอะไร"""
+        if self.file.closed:
+            return
+        if self.mm is not None:
+            self._maybe_flush(force=True)
+            if len(self.mm) != self._end:
+                self._unsynced = True
+            self.mm.close()
+            self.file.truncate(self._end)
+        if self._unsynced:
+            self.file.flush()
+            os.fsync(self._fd)
         self.file.close()
     
 
+    # --- mmap Helpers ---
+
+    def _scan_headers(self):
+        """สร้าง _free_offsets และ _id_index จาก header (IsActive, ID) ของทุกระเบียน
+        ใช้ struct ที่ข้ามส่วนที่เหลือของระเบียนด้วย pad bytes ให้ iter_unpack วนใน C โดยไม่ decode string"""
+        if self.mm is None:
+            return
+
+        with memoryview(self.mm) as view:
+            headers = self._scan_struct.iter_unpack(view[:self._usable_size()])
+            for offset, (is_active, record_id) in zip(range(0, self._end, self.record_size), headers):
+                if is_active:
+                    if record_id in self._id_index:
+                        self._dup_ids.add(record_id)
+                    else:
+                        self._id_index[record_id] = offset
+                else:
+                    self._free_offsets.append(offset)  # offset เรียงจากน้อยไปมาก = เป็น heap อยู่แล้ว
+
+    def _index_add(self, record_id: int, offset: int):
+        """ใส่ ID ลง index; ถ้า ID ซ้ำให้ index ชี้ระเบียนที่อยู่ต้นไฟล์ที่สุด"""
+        existing = self._id_index.get(record_id)
+        if existing is None:
+            self._id_index[record_id] = offset
+        else:
+            self._id_index[record_id] = min(existing, offset)
+            self._dup_ids.add(record_id)
+
+    def _index_remove(self, record_id: int):
+        """เอา ID ออกจาก index; ถ้า ID นี้ยังมีระเบียนซ้ำเหลืออยู่ ให้สแกน header หาระเบียนถัดไปแทน"""
+        self._id_index.pop(record_id, None)
+        if record_id not in self._dup_ids:
+            return
+
+        with memoryview(self.mm) as view:
+            offsets = [
+                offset
+                for offset, (is_active, stored_id) in zip(
+                    range(0, self._end, self.record_size),
+                    self._scan_struct.iter_unpack(view[:self._usable_size()])
+                )
+                if is_active and stored_id == record_id
+            ]
+        if offsets:
+            self._id_index[record_id] = offsets[0]
+        if len(offsets) <= 1:
+            self._dup_ids.discard(record_id)
+
+    def _usable_size(self) -> int:
+        """ขนาดข้อมูลที่ปัดลงให้เป็นจำนวนเต็มของระเบียน (ไม่นับเศษระเบียนท้ายไฟล์)"""
+        return self._end - self._end % self.record_size
+
+    def _remap_if_needed(self, new_size: int):
+        """ขยายไฟล์และ map เมื่อจะเขียนเกินขนาดปัจจุบัน (ขยายเป็น 2 เท่าเหมือน list.append)"""
+        if self.mm is None:
+            self.file.truncate(new_size)
+            self.mm = mmap.mmap(self._fd, 0, access=mmap.ACCESS_WRITE)
+            return
+
+        capacity = len(self.mm)
+        if capacity >= new_size:
+            return
+        new_capacity = max(new_size, capacity * 2)
+        # mmap.resize ขยายทั้งไฟล์และ mapping เดิม (mremap บน Linux) ไม่ต้อง flush/close/map ใหม่
+        # หน้าที่ยังไม่ได้ flush ยังอยู่ใน mapping เดิม ช่วง dirty ที่จดไว้จึงใช้ต่อได้
+        try:
+            self.mm.resize(new_capacity)
+        except SystemError:
+            # แพลตฟอร์มที่ไม่มี mremap (เช่น macOS) resize ไม่ได้: flush, ปิด map, ขยายไฟล์ แล้ว map ใหม่
+            self._maybe_flush(force=True)
+            self.mm.close()
+            self.file.truncate(new_capacity)
+            self.mm = mmap.mmap(self._fd, 0, access=mmap.ACCESS_WRITE)
+
+    def _write_at(self, offset: int, data: bytes):
+        """เขียนลง mmap และจดช่วงที่ต้อง flush ไว้ (flush จริงตาม WRITE_FLUSH_THRESHOLD)"""
+        end = offset + len(data)
+        self.mm[offset:end] = data
+
+        self._dirty_start = offset if self._dirty_start is None else min(self._dirty_start, offset)
+        self._dirty_end = max(self._dirty_end, end)
+        self._dirty_bytes += len(data)
+        self._unsynced = True
+        self._maybe_flush()
+
+    def _maybe_flush(self, force: bool = False):
+        if self._dirty_start is None:
+            return
+        if not force and self._dirty_bytes < WRITE_FLUSH_THRESHOLD:
+            return
+
+        # mmap.flush ต้องใช้ offset ที่ตรงกับขอบ page
+        start = self._dirty_start - self._dirty_start % mmap.PAGESIZE
+        self.mm.flush(start, self._dirty_end - start)
+        self._dirty_start = None
+        self._dirty_end = 0
+        self._dirty_bytes = 0
+
     # --- Utility Overrides ---
 
-    def _pack_record(self, data: Dict[str, Any]) -> bytes:
+    def _pack_record(self, data: Dict[str, Any]) -> bytearray:
         raise NotImplementedError("Subclass must implement _pack_record.")
 
-    def _unpack_record(self, record_bytes: bytes) -> Dict[str, Any]:
-        raise NotImplementedError("Subclass must implement _unpack_record.")
+    def _to_record(self, unpacked_data: Tuple[Any, ...]) -> RecordT:
+        raise NotImplementedError("Subclass must implement _to_record.")
+
+    def _unpack_record(self, record_bytes: bytes, offset: int = 0) -> RecordT:
+        return self._to_record(self._struct.unpack_from(record_bytes, offset))
+
+    def _peek_id_active(self, record_bytes: bytes, offset: int = 0) -> Tuple[bool, int]:
+        """อ่านเฉพาะ 5 ไบต์แรก (IsActive, ID) โดยไม่ decode ฟิลด์อื่น"""
+        return self._header_struct.unpack_from(record_bytes, offset)
 
     # --- CRUD Base Logic ---
 
@@ -64,51 +252,71 @@ class FileManager:
         data['IsActive'] = True
         packed_data = self._pack_record(data)
 
-        self.file.seek(0, os.SEEK_SET)
-        
-        while True:
-            current_offset = self.file.tell() 
-            
-            status_byte = self.file.read(1)
-            if not status_byte: break
-            
-            remaining_bytes = self.file.read(self.record_size - 1)
-            if len(remaining_bytes) < self.record_size - 1:
-                break
-            
-            is_active = struct.unpack('< ?', status_byte)[0]
-            
-            if not is_active:
-                self.file.seek(current_offset, os.SEEK_SET) 
-                self.file.write(packed_data)
-                self.file.flush()
-                print(f"✅ Reusing free space at offset: {current_offset} bytes in {self.filename}.")
-                return current_offset
-            
-        self.file.seek(0, os.SEEK_END)
-        offset = self.file.tell()
-        self.file.write(packed_data)
-        self.file.flush()
+        if self._free_offsets:
+            current_offset = heapq.heappop(self._free_offsets)
+            self._write_at(current_offset, packed_data)
+            self._index_add(data['ID'], current_offset)
+            print(f"✅ Reusing free space at offset: {current_offset} bytes in {self.filename}.")
+            return current_offset
+
+        offset = self._end
+        self._remap_if_needed(offset + self.record_size)
+        self._end = offset + self.record_size
+        self._write_at(offset, packed_data)
+        self._index_add(data['ID'], offset)
         print(f"➕ Appended new record at offset: {offset} bytes in {self.filename}.")
         return offset
 
-    def get_record_by_id(self, record_id: int) -> Optional[Tuple[Dict[str, Any], int]]:
-        self.file.seek(0, os.SEEK_SET)
-        offset = 0
-        
-        while True:
-            record_bytes = self.file.read(self.record_size)
-            if len(record_bytes) < self.record_size: 
-                break
-            
-            try:
-                record_data = self._unpack_record(record_bytes)
-                if record_data['IsActive'] and record_data['ID'] == record_id:
-                    return record_data, offset
-            except struct.error: pass 
-            
-            offset += self.record_size
-        return None
+    def add_records_bulk(self, records: List[Dict[str, Any]]) -> List[int]:
+        """C - เพิ่มหลายระเบียนพร้อมกัน (เติมช่องว่างก่อนเหมือน add_record ส่วนที่เหลือต่อท้ายไฟล์ด้วยการเขียนครั้งเดียว)"""
+        if not records:
+            return []
+
+        # pack ทุกระเบียนลง buffer เดียวก่อนเขียน ถ้ามีระเบียนไหน pack ไม่ได้ ไฟล์จะไม่ถูกแตะเลย
+        rs = self.record_size
+        packed = bytearray(len(records) * rs)
+        for i, data in enumerate(records):
+            data['IsActive'] = True
+            packed[i * rs:(i + 1) * rs] = self._pack_record(data)
+
+        offsets = []
+        reused = min(len(records), len(self._free_offsets))
+        appended = len(records) - reused
+        with memoryview(packed) as view:
+            for i in range(reused):
+                offset = heapq.heappop(self._free_offsets)
+                self._write_at(offset, view[i * rs:(i + 1) * rs])
+                offsets.append(offset)
+
+            if appended:
+                base = self._end
+                self._remap_if_needed(base + appended * rs)
+                self._end = base + appended * rs
+                self._write_at(base, view[reused * rs:])
+                offsets.extend(range(base, self._end, rs))
+
+        for data, offset in zip(records, offsets):
+            self._index_add(data['ID'], offset)
+
+        print(f"➕ Added {len(records)} records ({reused} reused, {appended} appended) in {self.filename}.")
+        return offsets
+
+    def _locate(self, record_id: int) -> Optional[int]:
+        """หา offset ของระเบียน Active จาก index (ตรวจ header ซ้ำเผื่อ index ไม่ตรงกับไฟล์) ไม่ decode ทั้งระเบียน"""
+        offset = self._id_index.get(record_id)
+        if offset is None or self._peek_id_active(self.mm, offset) != (True, record_id):
+            return None
+        return offset
+
+    def has_record(self, record_id: int) -> bool:
+        """ตรวจว่ามีระเบียน Active ของ ID นี้หรือไม่ (ไม่ decode ระเบียน)"""
+        return self._locate(record_id) is not None
+
+    def get_record_by_id(self, record_id: int) -> Optional[Tuple[RecordT, int]]:
+        offset = self._locate(record_id)
+        if offset is None:
+            return None
+        return self._unpack_record(self.mm, offset), offset
 
     def update_record(self, record_id: int, new_data: Dict[str, Any]) -> bool:
         """U - แก้ไขระเบียน"""
@@ -118,127 +326,166 @@ class FileManager:
             return False
         
         old_data, offset = result
-        updated_data = old_data.copy()
+        updated_data = old_data._asdict()  # record เป็น NamedTuple (อ่านอย่างเดียว) แปลงเป็น dict เฉพาะตอนจะแก้
         if 'EndDate' not in updated_data:
              updated_data['EndDate'] = 0 
 
         updated_data.update(new_data)
         updated_data['ID'] = record_id
-        updated_data['IsActive'] = old_data['IsActive'] 
-        updated_data.update(new_data)
-        updated_data['ID'] = record_id
-        updated_data['IsActive'] = old_data['IsActive'] 
+        updated_data['IsActive'] = old_data.IsActive
         
         packed_data = self._pack_record(updated_data)
         
-        self.file.seek(offset, os.SEEK_SET)
-        self.file.write(packed_data)
-        self.file.flush()
+        self._write_at(offset, packed_data)
         
         print(f"📝 Successfully updated ID {record_id} at offset {offset} in {self.filename}.")
         return True
 
     def delete_record(self, record_id: int) -> bool:
-        """D - ลบแบบ Soft Delete"""
-        result = self.get_record_by_id(record_id)
-        if result is None:
+        """D - ลบแบบ Soft Delete (ใช้แค่ index + header ไม่ต้อง decode ทั้งระเบียน)"""
+        offset = self._locate(record_id)
+        if offset is None:
             print(f"❌ Error: ID {record_id} not found or already deleted in {self.filename}.")
             return False
-        
-        _, offset = result
-        deleted_flag_bytes = struct.pack('< ?', False)
-        
-        self.file.seek(offset, os.SEEK_SET)
-        self.file.write(deleted_flag_bytes)
-        self.file.flush()
+
+        self._write_at(offset, self._deleted_flag)
+        heapq.heappush(self._free_offsets, offset)
+        self._index_remove(record_id)
         
         print(f"🗑️ Soft deleted ID {record_id} at offset {offset} in {self.filename}.")
         return True
 
-    def get_all_records(self) -> List[Dict[str, Any]]:
-        active_records = []
-        self.file.seek(0, os.SEEK_SET)
-        while True:
-            record_bytes = self.file.read(self.record_size)
-            if len(record_bytes) < self.record_size:
-                break
-            
-            try:
-                record_data = self._unpack_record(record_bytes)
-                if record_data['IsActive']:
-                    active_records.append(record_data)
-            except struct.error: pass
-        return active_records
+    def get_all_rows(self) -> List[Tuple[Any, ...]]:
+        """อ่านระเบียน Active ทั้งหมดเป็น tuple ดิบจาก struct (ไม่สร้าง record / ไม่ decode string)"""
+        if self.mm is None:
+            return []
+
+        with memoryview(self.mm) as view:
+            return [
+                unpacked_data
+                for unpacked_data in self._struct.iter_unpack(view[:self._usable_size()])
+                if unpacked_data[0]
+            ]
+
+    def count_active(self) -> int:
+        """นับระเบียน Active จากไบต์ IsActive อย่างเดียว (slice แบบ step ทีละ record_size แล้ว count ใน C ไม่ unpack)"""
+        if self.mm is None:
+            return 0
+
+        usable = self._usable_size()
+        flags = self.mm[0:usable:self.record_size]
+        return len(flags) - flags.count(0)
+
+    def get_all_records(self) -> List[RecordT]:
+        """อ่านระเบียน Active ทั้งหมดเป็น record (NamedTuple) ด้วย iter_unpack รอบเดียว"""
+        if self.mm is None:
+            return []
+
+        to_record = self._to_record
+        with memoryview(self.mm) as view:
+            return [
+                to_record(unpacked_data)
+                for unpacked_data in self._struct.iter_unpack(view[:self._usable_size()])
+                if unpacked_data[0]
+            ]
+
+    def iter_all_records(self) -> Iterator[RecordT]:
+        """
+        คืนระเบียน Active ทีละรายการแบบ lazy (ไม่สร้าง list ทั้งหมดไว้ในหน่วยความจำ)
+        อ่านด้วย unpack_from ตาม offset ตรงๆ จึงไม่ค้าง memoryview ไว้บน mmap ระหว่าง yield
+        """
+        if self.mm is None:
+            return
+
+        mm = self.mm
+        unpack_from = self._struct.unpack_from
+        to_record = self._to_record
+        for offset in range(0, self._usable_size(), self.record_size):
+            if mm[offset]:  # ไบต์แรกของระเบียนคือ IsActive
+                yield to_record(unpack_from(mm, offset))
 
 # ==============================================================================
 # 3.Minimal Overrides
 # ==============================================================================
 
-class CarManager(FileManager):
+# record ที่อ่านจากไฟล์: NamedTuple (อ่านอย่างเดียว เบากว่า dict) ลำดับฟิลด์ตรงกับ struct format
+class CarRecord(NamedTuple):
+    IsActive: bool
+    ID: int
+    Model: str
+    LicensePlate: str
+    DailyRate: float
+
+class CustomerRecord(NamedTuple):
+    IsActive: bool
+    ID: int
+    Name: str
+    Phone: str
+
+class RentalRecord(NamedTuple):
+    IsActive: bool
+    ID: int
+    CustomerID: int
+    CarID: int
+    StartDate: int
+    EndDate: int
+    TotalPrice: float
+
+class CarManager(FileManager[CarRecord]):
     def __init__(self):
         super().__init__(CAR_FORMAT, CAR_FILE_NAME, CAR_ENCODING)
     
-    def _pack_record(self, data: Dict[str, Any]) -> bytes:
-        model_bytes = data['Model'].encode(self.encoding).ljust(30, b'\x00')
-        license_bytes = data['LicensePlate'].encode(self.encoding).ljust(10, b'\x00')
-        
-        return struct.pack(
-            self.format,
+    def _pack_record(self, data: Dict[str, Any]) -> bytearray:
+        # ฟิลด์ 30s/10s ของ struct เติม \x00 และตัดความยาวให้เองอยู่แล้ว ไม่ต้อง ljust
+        encoding = self.encoding
+        self._struct.pack_into(
+            self._buf, 0,
             data.get('IsActive', True),
             data['ID'],
-            model_bytes,
-            license_bytes,
+            data['Model'].encode(encoding),
+            data['LicensePlate'].encode(encoding),
             data['DailyRate']
         )
+        return self._buf
 
-    def _unpack_record(self, record_bytes: bytes) -> Dict[str, Any]:
-        unpacked_data = struct.unpack(self.format, record_bytes)
-        model = unpacked_data[2].split(b'\x00', 1)[0].decode(self.encoding, errors='ignore').strip()
-        license_plate = unpacked_data[3].split(b'\x00', 1)[0].decode(self.encoding, errors='ignore').strip()
+    def _to_record(self, unpacked_data: Tuple[Any, ...]) -> CarRecord:
+        is_active, car_id, model_bytes, plate_bytes, daily_rate = unpacked_data
+        encoding = self.encoding
+        model = model_bytes.rstrip(b'\x00').decode(encoding, errors='ignore').strip()
+        license_plate = plate_bytes.rstrip(b'\x00').decode(encoding, errors='ignore').strip()
         
-        return {
-            'IsActive': unpacked_data[0],
-            'ID': unpacked_data[1],
-            'Model': model,
-            'LicensePlate': license_plate,
-            'DailyRate': unpacked_data[4]
-        }
-class CustomerManager(FileManager):
+        return CarRecord(is_active, car_id, model, license_plate, daily_rate)
+class CustomerManager(FileManager[CustomerRecord]):
     def __init__(self):
         super().__init__(CUSTOMER_FORMAT, CUSTOMER_FILE_NAME, CUSTOMER_ENCODING)
     
-    def _pack_record(self, data: Dict[str, Any]) -> bytes:
-        name_bytes = data['Name'].encode(self.encoding).ljust(50, b'\x00')
-        phone_bytes = data['Phone'].encode(self.encoding).ljust(15, b'\x00')
-        
-        return struct.pack(
-            self.format,
+    def _pack_record(self, data: Dict[str, Any]) -> bytearray:
+        # ฟิลด์ 50s/15s ของ struct เติม \x00 และตัดความยาวให้เองอยู่แล้ว ไม่ต้อง ljust
+        encoding = self.encoding
+        self._struct.pack_into(
+            self._buf, 0,
             data.get('IsActive', True),
             data['ID'],
-            name_bytes,
-            phone_bytes
+            data['Name'].encode(encoding),
+            data['Phone'].encode(encoding)
         )
+        return self._buf
 
-    def _unpack_record(self, record_bytes: bytes) -> Dict[str, Any]:
-        unpacked_data = struct.unpack(self.format, record_bytes)
-        
-        name = unpacked_data[2].split(b'\x00', 1)[0].decode(self.encoding, errors='ignore').strip()
-        phone = unpacked_data[3].split(b'\x00', 1)[0].decode(self.encoding, errors='ignore').strip()
+    def _to_record(self, unpacked_data: Tuple[Any, ...]) -> CustomerRecord:
+        is_active, cust_id, name_bytes, phone_bytes = unpacked_data
+        encoding = self.encoding
+        name = name_bytes.rstrip(b'\x00').decode(encoding, errors='ignore').strip()
+        phone = phone_bytes.rstrip(b'\x00').decode(encoding, errors='ignore').strip()
         
-        return {
-            'IsActive': unpacked_data[0],
-            'ID': unpacked_data[1],
-            'Name': name,
-            'Phone': phone
-        }
-
-class RentalManager(FileManager):
+        return CustomerRecord(is_active, cust_id, name, phone)
+
+class RentalManager(FileManager[RentalRecord]):
     def __init__(self):
         super().__init__(RENTAL_FORMAT, RENTAL_FILE_NAME, RENTAL_ENCODING)
     
-    def _pack_record(self, data: Dict[str, Any]) -> bytes:
-        return struct.pack(
-            self.format,
+    def _pack_record(self, data: Dict[str, Any]) -> bytearray:
+        self._struct.pack_into(
+            self._buf, 0,
             data.get('IsActive', True),  # 1. ?
             int(data['ID']),             # 2. i
             int(data['CustomerID']),     # 3. i
@@ -247,25 +494,53 @@ class RentalManager(FileManager):
             int(data.get('EndDate', 0)), # 6. i
             float(data['TotalPrice'])    # 7. d
         )
+        return self._buf
 
-    def _unpack_record(self, record_bytes: bytes) -> Dict[str, Any]:
-        unpacked_data = struct.unpack(self.format, record_bytes)
-
-        return {
-            'IsActive': unpacked_data[0],
-            'ID': unpacked_data[1],
-            'CustomerID': unpacked_data[2],
-            'CarID': unpacked_data[3],
-            'StartDate': unpacked_data[4],
-            'EndDate': unpacked_data[5],
-            'TotalPrice': unpacked_data[6]
-        }
+    def _to_record(self, unpacked_data: Tuple[Any, ...]) -> RentalRecord:
+        # ฟิลด์เป็นตัวเลขทั้งหมด ไม่ต้อง decode จึงสร้าง record จาก tuple ได้ตรงๆ
+        return RentalRecord._make(unpacked_data)
     
 # ==============================================================================
 # 4.Utility สำหรับเมนูและการจัดการอินพุต
 # ==============================================================================
 
-def get_user_choice(prompt: str, valid_choices: List[str]) -> str:
+# ตัวเลือกของแต่ละเมนู (frozenset: สร้างครั้งเดียว, ตรวจ in ได้ O(1))
+_MAIN_CHOICES = frozenset('123RX')
+_CAR_CHOICES = frozenset('AUDVSX')
+_CUST_CHOICES = frozenset('AUDVSX')
+_RENT_CHOICES = frozenset('AVDSX')
+
+# ข้อความเมนู (สร้างครั้งเดียว เขียนออกด้วย sys.stdout.write ครั้งเดียวต่อรอบ)
+_MAIN_MENU = (
+    "\n" + "=" * 50 + "\n"
+    "             ระบบจัดการเช่ารถยนต์ (MAIN MENU)\n"
+    + "=" * 50 + "\n"
+    "[1] จัดการข้อมูลรถยนต์\n"
+    "[2] จัดการข้อมูลลูกค้า\n"
+    "[3] จัดการสัญญาเช่า\n"
+    "[R] สร้างรายงานรวมทั้งหมด (.txt)\n"
+    "[X] ออกจากระบบ (ปิดไฟล์)\n"
+)
+_CAR_MENU = (
+    "\n=== [1] จัดการข้อมูลรถยนต์ ===\n"
+    "A: เพิ่มรถยนต์ | U: แก้ไข | D: ลบ (Soft Delete)\n"
+    "V: ดูทั้งหมด | S: ค้นหาด้วย ID\n"
+    "X: กลับสู่เมนูหลัก\n"
+)
+_CUST_MENU = (
+    "\n=== [2] จัดการข้อมูลลูกค้า ===\n"
+    "A: เพิ่มลูกค้า | U: แก้ไข | D: ลบ (Soft Delete)\n"
+    "V: ดูทั้งหมด | S: ค้นหาด้วย ID\n"
+    "X: กลับสู่เมนูหลัก\n"
+)
+_RENT_MENU = (
+    "\n=== [3] จัดการสัญญาเช่า ===\n"
+    "A: สร้างสัญญา | V: ดูทั้งหมด | S: ค้นหาด้วย ID\n"
+    "D: คืนรถ (Soft Delete)\n"
+    "X: กลับสู่เมนูหลัก\n"
+)
+
+def get_user_choice(prompt: str, valid_choices: AbstractSet[str]) -> str:
     """รับอินพุตจากผู้ใช้และตรวจสอบว่าอยู่ในตัวเลือกที่กำหนดหรือไม่"""
     while True:
         choice = input(prompt).strip().upper()
@@ -289,19 +564,47 @@ def get_float_input(prompt: str) -> float:
         except ValueError:
             print("❌ กรุณาป้อนเฉพาะตัวเลขเท่านั้น")
 
+def _split_ddmmyyyy(date_int: int) -> Tuple[int, int, int]:
+    """แยก DDMMYYYY (int) เป็น (day, month, year) ด้วยเลขคณิต ไม่ต้องผ่าน strptime"""
+    year = date_int % 10000
+    day_month = date_int // 10000
+    return day_month // 100, day_month % 100, year
+
+def _to_date(date_int: int) -> datetime.date:
+    """แปลง DDMMYYYY (int) เป็น datetime.date (ValueError ถ้าวันที่ไม่ถูกต้อง)"""
+    day, month, year = _split_ddmmyyyy(date_int)
+    return datetime.date(year, month, day)
+
+def _format_ddmmyyyy(date_int: int) -> str:
+    """แปลง DDMMYYYY (int) เป็น DD-MM-YYYY (str)"""
+    day, month, year = _split_ddmmyyyy(date_int)
+    return f"{day:02d}-{month:02d}-{year:04d}"
+
+def _format_timestamp(now: datetime.datetime) -> str:
+    """แปลง datetime เป็น YYYY-MM-DD HH:MM:SS ด้วย f-string (ไม่ผ่าน strftime)"""
+    return f"{now.year:04d}-{now.month:02d}-{now.day:02d} {now.hour:02d}:{now.minute:02d}:{now.second:02d}"
+
 def get_date_input(prompt: str) -> int:
     """รับอินพุตวันที่และแปลงเป็น DDMMYYYY int"""
     while True:
         date_str = input(prompt).strip() 
         if len(date_str) == 8 and date_str.isdigit():
             try:
-                datetime.datetime.strptime(date_str, '%d%m%Y') 
-                return int(date_str)
+                date_int = int(date_str)
+                _to_date(date_int)
+                return date_int
             except ValueError:
                 print("❌ รูปแบบวันที่ไม่ถูกต้อง")
         else:
             print("❌ รูปแบบไม่ถูกต้อง กรุณาป้อนเป็น DDMMYYYY เช่น 25102025")
 
+def build_row_format(fields: List[Tuple[str, int]], float_fields: Tuple[str, ...] = ()) -> str:
+    """สร้าง template สำหรับ str.format ของแถวรายงานครั้งเดียวจากตาราง (ชื่อฟิลด์, ความกว้าง)"""
+    return ' | '.join(
+        f"{{:<{length}.2f}}" if name in float_fields else f"{{:<{length}}}"
+        for name, length in fields
+    )
+
 def generate_master_report(car_mgr: 'CarManager', cust_mgr: 'CustomerManager', rental_mgr: 'RentalManager', report_filename: str = 'master_report.txt'):
     """สร้างไฟล์รายงานรวมที่แสดงข้อมูล Active ทั้งหมดจากทุก Manager"""
     
@@ -311,79 +614,70 @@ def generate_master_report(car_mgr: 'CarManager', cust_mgr: 'CustomerManager', r
     report_content.append("=" * 70)
     report_content.append(f"{' ' * ((70 - len(title)) // 2)}{title}")
     report_content.append("=" * 70)
-    report_content.append(f"Generated On: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    report_content.append(f"Generated On: {_format_timestamp(datetime.datetime.now())}")
     report_content.append("-" * 70)
     
     report_content.append("\n\n--- 🚗 ACTIVE CAR INVENTORY ---")
     car_fields = [('ID', 5), ('Model', 30), ('LicensePlate', 15), ('DailyRate', 12)]
-    car_records = car_mgr.get_all_records()
-    report_content.append(f"Total Active Cars: {len(car_records)}")
+    # นับจาก IsActive ก่อน แล้วค่อยอ่านระเบียนแบบ lazy เฉพาะตอนมีข้อมูลให้แสดง
+    car_count = car_mgr.count_active()
+    report_content.append(f"Total Active Cars: {car_count}")
     
     header_line = ' | '.join(f"{name:<{length}}" for name, length in car_fields)
     report_content.append(header_line)
     report_content.append("-" * (sum(length for _, length in car_fields) + len(car_fields) * 3))
     
-    if car_records:
-        for car in car_records:
-            line_parts = []
-            for field_name, length in car_fields:
-                value = car.get(field_name, '')
-                if isinstance(value, float):
-                    line_parts.append(f"{value:.2f}".ljust(length))
-                else:
-                    line_parts.append(f"{str(value):<{length}}")
-            report_content.append(' | '.join(line_parts))
+    car_row_format = build_row_format(car_fields, ('DailyRate',))
+    if car_count:
+        # template สร้างครั้งเดียวแล้ว ต่อแถวเหลือ format ครั้งเดียว (extend จาก generator แทน append ทีละแถว)
+        report_content.extend(
+            car_row_format.format(car.ID, car.Model, car.LicensePlate, car.DailyRate)
+            for car in car_mgr.iter_all_records()
+        )
     else:
         report_content.append("No active cars found.")
         
     report_content.append("\n\n--- 🧑 ACTIVE CUSTOMER DIRECTORY ---")
     cust_fields = [('ID', 5), ('Name', 45), ('Phone', 15)] # ใช้ 45s สำหรับชื่อที่ยาวขึ้น
-    cust_records = cust_mgr.get_all_records()
-    report_content.append(f"Total Active Customers: {len(cust_records)}")
+    cust_count = cust_mgr.count_active()
+    report_content.append(f"Total Active Customers: {cust_count}")
     
     header_line = ' | '.join(f"{name:<{length}}" for name, length in cust_fields)
     report_content.append(header_line)
     report_content.append("-" * (sum(length for _, length in cust_fields) + len(cust_fields) * 3))
     
-    if cust_records:
-        for cust in cust_records:
-            line_parts = []
-            for field_name, length in cust_fields:
-                value = cust.get(field_name, '')
-                line_parts.append(f"{str(value):<{length}}")
-            report_content.append(' | '.join(line_parts))
+    cust_row_format = build_row_format(cust_fields)
+    if cust_count:
+        report_content.extend(
+            cust_row_format.format(cust.ID, cust.Name, cust.Phone) for cust in cust_mgr.iter_all_records()
+        )
     else:
         report_content.append("No active customers found.")
 
     report_content.append("\n\n--- 🧾 ACTIVE RENTAL AGREEMENTS ---")
     rental_fields = [('ID', 5), ('CustomerID', 10), ('CarID', 7), ('StartDate', 10), ('Days', 5), ('TotalPrice', 12)]
-    rental_records = rental_mgr.get_all_records()
-    report_content.append(f"Total Active Rentals: {len(rental_records)}")
+    # Rental มีแต่ฟิลด์ตัวเลข จึงจัดรูปแบบจาก tuple ดิบได้เลยโดยไม่ต้องสร้าง record
+    rental_count = rental_mgr.count_active()
+    report_content.append(f"Total Active Rentals: {rental_count}")
     
     header_line = ' | '.join(f"{name:<{length}}" for name, length in rental_fields)
     report_content.append(header_line)
     report_content.append("-" * (sum(length for _, length in rental_fields) + len(rental_fields) * 3))
     
-    if rental_records:
-        for rent in rental_records:
-            line_parts = []
-            for field_name, length in rental_fields:
-                value = rent.get(field_name, '')
-                if isinstance(value, float):
-                    line_parts.append(f"{value:.2f}".ljust(length))
-                elif field_name == 'StartDate':
-                     # แสดง StartDate (DDMMYYYY)
-                     line_parts.append(f"{value}".ljust(length)) 
-                else:
-                    line_parts.append(f"{str(value):<{length}}")
-            report_content.append(' | '.join(line_parts))
+    # StartDate แสดงเป็น DDMMYYYY ตามที่เก็บ, Days ไม่ได้เก็บไว้ในไฟล์จึงเว้นว่าง
+    rental_row_format = build_row_format(rental_fields, ('TotalPrice',))
+    if rental_count:
+        report_content.extend(
+            rental_row_format.format(rent_id, cust_id, car_id, start_date, '', total_price)
+            for _, rent_id, cust_id, car_id, start_date, _, total_price in rental_mgr.get_all_rows()
+        )
     else:
         report_content.append("No active rental agreements found.")
 
     report_content.append("\n" + "=" * 70)
     
     try:
-        with open(report_filename, 'w', encoding='utf-8') as f:
+        with open(report_filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
             f.write('\n'.join(report_content) + '\n')
         print(f"\n📄 รายงานรวม (Master Report) ถูกสร้างสำเร็จที่ '{report_filename}'.")
     except IOError as e:
@@ -395,12 +689,9 @@ def generate_master_report(car_mgr: 'CarManager', cust_mgr: 'CustomerManager', r
 
 def run_car_menu(manager: CarManager):
     while True:
-        print("\n=== [1] จัดการข้อมูลรถยนต์ ===")
-        print("A: เพิ่มรถยนต์ | U: แก้ไข | D: ลบ (Soft Delete)")
-        print("V: ดูทั้งหมด | S: ค้นหาด้วย ID")
-        print("X: กลับสู่เมนูหลัก")
+        sys.stdout.write(_CAR_MENU)
         
-        choice = get_user_choice(">> กรุณาเลือก: ", ['A', 'U', 'D', 'V', 'S', 'X'])
+        choice = get_user_choice(">> กรุณาเลือก: ", _CAR_CHOICES)
 
         if choice == 'A':
             print("\n-- เพิ่มรถยนต์ --")
@@ -423,12 +714,16 @@ def run_car_menu(manager: CarManager):
 
         elif choice == 'V':
             print("\n-- รายการรถยนต์ทั้งหมด (Active) --")
-            cars = manager.get_all_records()
-            if not cars:
+            cars = manager.iter_all_records()
+            first = next(cars, None)
+            if first is None:
                 print("ไม่มีข้อมูลรถยนต์ที่ใช้งานอยู่")
             else:
-                for car in cars:
-                    print(f"ID: {car['ID']} | Model: {car['Model']:<30} | Plate: {car['LicensePlate']:<10} | Rate: {car['DailyRate']:.2f}")
+                # รวมทุกแถวแล้วเขียนครั้งเดียว แทน print ทีละแถว
+                sys.stdout.write(''.join(
+                    f"ID: {car.ID} | Model: {car.Model:<30} | Plate: {car.LicensePlate:<10} | Rate: {car.DailyRate:.2f}\n"
+                    for car in chain((first,), cars)
+                ))
 
         elif choice == 'S':
             print("\n-- ค้นหารถยนต์ด้วย ID --")
@@ -438,7 +733,7 @@ def run_car_menu(manager: CarManager):
             
             if result is not None:
                 car, offset = result
-                print(f"✅ พบข้อมูล: ID: {car['ID']} | Model: {car['Model']} | Plate: {car['LicensePlate']} | Rate: {car['DailyRate']:.2f} (Offset: {offset} bytes)")
+                print(f"✅ พบข้อมูล: ID: {car.ID} | Model: {car.Model} | Plate: {car.LicensePlate} | Rate: {car.DailyRate:.2f} (Offset: {offset} bytes)")
             else:
                 print("❌ ไม่พบรถยนต์ ID นี้ หรือรถยนต์ถูกลบไปแล้ว")
 
@@ -447,12 +742,9 @@ def run_car_menu(manager: CarManager):
 
 def run_customer_menu(manager: CustomerManager):
     while True:
-        print("\n=== [2] จัดการข้อมูลลูกค้า ===")
-        print("A: เพิ่มลูกค้า | U: แก้ไข | D: ลบ (Soft Delete)")
-        print("V: ดูทั้งหมด | S: ค้นหาด้วย ID")
-        print("X: กลับสู่เมนูหลัก")
+        sys.stdout.write(_CUST_MENU)
         
-        choice = get_user_choice(">> กรุณาเลือก: ", ['A', 'U', 'D', 'V', 'S', 'X'])
+        choice = get_user_choice(">> กรุณาเลือก: ", _CUST_CHOICES)
         
         if choice == 'A':
             print("\n-- เพิ่มลูกค้า --")
@@ -474,12 +766,15 @@ def run_customer_menu(manager: CustomerManager):
             
         elif choice == 'V':
             print("\n-- รายชื่อลูกค้าทั้งหมด (Active) --")
-            customers = manager.get_all_records()
-            if not customers:
+            customers = manager.iter_all_records()
+            first = next(customers, None)
+            if first is None:
                 print("ไม่มีข้อมูลลูกค้าที่ใช้งานอยู่")
             else:
-                for cust in customers:
-                    print(f"ID: {cust['ID']} | Name: {cust['Name']:<30} | Phone: {cust['Phone']}")
+                sys.stdout.write(''.join(
+                    f"ID: {cust.ID} | Name: {cust.Name:<30} | Phone: {cust.Phone}\n"
+                    for cust in chain((first,), customers)
+                ))
         
         elif choice == 'S':
             print("\n-- ค้นหาลูกค้าด้วย ID --")
@@ -489,21 +784,30 @@ def run_customer_menu(manager: CustomerManager):
             
             if result is not None:
                 cust, offset = result
-                print(f"✅ พบข้อมูล: ID: {cust['ID']} | Name: {cust['Name']} | Phone: {cust['Phone']} (Offset: {offset} bytes)")
+                print(f"✅ พบข้อมูล: ID: {cust.ID} | Name: {cust.Name} | Phone: {cust.Phone} (Offset: {offset} bytes)")
             else:
                 print("❌ ไม่พบลูกค้า ID นี้ หรือลูกค้าถูกลบไปแล้ว")
 
         elif choice == 'X':
             break
 
+def validate_rental(cust_mgr: CustomerManager, cust_id: int, car_mgr: CarManager, car_id: int) -> Tuple[Optional[CarRecord], Optional[str]]:
+    """
+    ตรวจลูกค้าและรถของสัญญาเช่าใหม่ในครั้งเดียว
+    คืน (ข้อมูลรถ, None) ถ้าผ่าน หรือ (None, ข้อความ error) ถ้าไม่ผ่าน (ลูกค้าตรวจแค่ index + header ไม่ decode)
+    """
+    if not cust_mgr.has_record(cust_id):
+        return None, "❌ ID ลูกค้าไม่ถูกต้อง หรือลูกค้าถูกลบไปแล้ว"
+    car_result = car_mgr.get_record_by_id(car_id)
+    if car_result is None:
+        return None, "❌ ID รถยนต์ไม่ถูกต้อง หรือรถถูกเช่าอยู่/ถูกลบไปแล้ว"
+    return car_result[0], None
+
 def run_rental_menu(manager: RentalManager, car_mgr: CarManager, cust_mgr: CustomerManager):
     while True:
-        print("\n=== [3] จัดการสัญญาเช่า ===")
-        print("A: สร้างสัญญา | V: ดูทั้งหมด | S: ค้นหาด้วย ID")
-        print("D: คืนรถ (Soft Delete)")
-        print("X: กลับสู่เมนูหลัก")
+        sys.stdout.write(_RENT_MENU)
         
-        choice = get_user_choice(">> กรุณาเลือก: ", ['A', 'V', 'D', 'S', 'X'])
+        choice = get_user_choice(">> กรุณาเลือก: ", _RENT_CHOICES)
         
         if choice == 'A':
             print("\n-- สร้างสัญญาเช่า --")
@@ -511,29 +815,23 @@ def run_rental_menu(manager: RentalManager, car_mgr: CarManager, cust_mgr: Custo
             cust_id = get_int_input("ID ลูกค้า: ")
             car_id = get_int_input("ID รถยนต์: ")
             
-            if not cust_mgr.get_record_by_id(cust_id):
-                print("❌ ID ลูกค้าไม่ถูกต้อง หรือลูกค้าถูกลบไปแล้ว")
-                continue
-            car_result = car_mgr.get_record_by_id(car_id)
-            if not car_result:
-                print("❌ ID รถยนต์ไม่ถูกต้อง หรือรถถูกเช่าอยู่/ถูกลบไปแล้ว")
+            car_data, error = validate_rental(cust_mgr, cust_id, car_mgr, car_id)
+            if car_data is None:
+                print(error)
                 continue
             
-            car_data, _ = car_result
-            daily_rate = car_data['DailyRate']
+            daily_rate = car_data.DailyRate
             
             start_date_int = get_date_input("วันที่เริ่มเช่า (DDMMYYYY): ")
             end_date_int = get_date_input("วันที่สิ้นสุดการเช่า (DDMMYYYY): ")
 
             try:
-                start_date_str = str(start_date_int).zfill(8)
-                end_date_str = str(end_date_int).zfill(8)
-                start_date_obj = datetime.datetime.strptime(start_date_str, '%d%m%Y')
-                end_date_obj = datetime.datetime.strptime(end_date_str, '%d%m%Y')
+                start_date_obj = _to_date(start_date_int)
+                end_date_obj = _to_date(end_date_int)
                 
-                print(f"  🗓️ วันที่เช่า: {start_date_obj.strftime('%d-%m-%Y')} ถึง {end_date_obj.strftime('%d-%m-%Y')}")
+                print(f"  🗓️ วันที่เช่า: {_format_ddmmyyyy(start_date_int)} ถึง {_format_ddmmyyyy(end_date_int)}")
                 
-                days = (end_date_obj - start_date_obj).days + 1 
+                days = end_date_obj.toordinal() - start_date_obj.toordinal() + 1 
                 total_price = daily_rate * days
                 print(f"✅ คำนวณจำนวนวันเช่า: {days} วัน")
             except ValueError:
@@ -555,15 +853,17 @@ def run_rental_menu(manager: RentalManager, car_mgr: CarManager, cust_mgr: Custo
 
         elif choice == 'V':
             print("\n-- รายการสัญญาเช่าทั้งหมด (Active) --")
-            rentals = manager.get_all_records()
-            if not rentals:
+            rentals = manager.iter_all_records()
+            first = next(rentals, None)
+            if first is None:
                 print("ไม่มีสัญญาเช่าที่ใช้งานอยู่")
             else:
-                for rent in rentals:
-                    start_date_display = format_date_display(rent.get('StartDate', 0))
-                    end_date_display = format_date_display(rent.get('EndDate', 0))
-
-                    print(f"ID: {rent['ID']} | CustID: {rent['CustomerID']} | CarID: {rent['CarID']} | Start: {start_date_display} | End: {end_date_display} | Total: {rent['TotalPrice']:.2f}")
+                sys.stdout.write(''.join(
+                    f"ID: {rent.ID} | CustID: {rent.CustomerID} | CarID: {rent.CarID} | "
+                    f"Start: {format_date_display(rent.StartDate)} | End: {format_date_display(rent.EndDate)} | "
+                    f"Total: {rent.TotalPrice:.2f}\n"
+                    for rent in chain((first,), rentals)
+                ))
 
         
 
@@ -577,7 +877,7 @@ def run_rental_menu(manager: RentalManager, car_mgr: CarManager, cust_mgr: Custo
                 return
 
             rent_data, _ = result
-            car_id = rent_data['CarID']
+            car_id = rent_data.CarID
             
             if manager.delete_record(rental_id):
                 print(f"✅ สัญญาเช่า ID {rental_id} ถูกปิดเรียบร้อยแล้ว (Soft Deleted).")
@@ -596,10 +896,10 @@ def run_rental_menu(manager: RentalManager, car_mgr: CarManager, cust_mgr: Custo
             if result is not None:
                 rent, _ = result 
                 
-                start_date_display = format_date_display(rent.get('StartDate', 0))
-                end_date_display = format_date_display(rent.get('EndDate', 0))
+                start_date_display = format_date_display(rent.StartDate)
+                end_date_display = format_date_display(rent.EndDate)
 
-                print(f"✅ พบข้อมูล: ID: {rent['ID']} | CustID: {rent['CustomerID']} | CarID: {rent['CarID']} | Start: {start_date_display} | End: {end_date_display} | Total: {rent['TotalPrice']:.2f}")
+                print(f"✅ พบข้อมูล: ID: {rent.ID} | CustID: {rent.CustomerID} | CarID: {rent.CarID} | Start: {start_date_display} | End: {end_date_display} | Total: {rent.TotalPrice:.2f}")
             else:
                 print("❌ ไม่พบสัญญาเช่า ID นี้ หรือสัญญานี้ถูกปิดไปแล้ว")
 
@@ -613,137 +913,123 @@ def generate_detailed_summary_report(car_mgr: 'CarManager', cust_mgr: 'CustomerM
     พร้อมข้อมูลการเช่าที่เกี่ยวข้อง และส่วนสรุปสถิติ
     """
     
+    # Pre-pass: อ่านทุกไฟล์และสร้าง index ทั้งหมดก่อน ลูปสร้างแถวด้านล่างจะเหลือแค่ dict lookup
     all_car_records = car_mgr.get_all_records() #
     active_rentals = rental_mgr.get_all_records()
-    rented_car_ids = {rent['CarID'] for rent in active_rentals}
-    rental_by_car_id = {rent['CarID']: rent for rent in active_rentals}
+    # อ่านลูกค้าทั้งหมดครั้งเดียว (reversed: ถ้า ID ซ้ำให้ได้ระเบียนแรกในไฟล์ เหมือน get_record_by_id)
+    cust_by_id = {cust.ID: cust for cust in reversed(cust_mgr.get_all_records())}
+    # วนสัญญาเช่ารอบเดียว: index ตาม CarID และเก็บวันที่ที่ไม่ซ้ำกันไว้แปลงครั้งเดียว
+    rental_by_car_id = {}
+    unique_dates = set()
+    for rent in active_rentals:
+        rental_by_car_id[rent.CarID] = rent
+        unique_dates.add(rent.StartDate)
+        unique_dates.add(rent.EndDate)
+    rented_car_ids = rental_by_car_id.keys()  # dict_keys ใช้ `in` / len() ได้เหมือน set
+    date_str = {d: format_date_display(d) for d in unique_dates}
+
+    # คอลัมน์ (Status, Rented, Cust ID, Name, Start Date, End Date) ของรถแต่ละคันที่ถูกเช่า
+    rented_cols = {}
+    for car_id, rent in rental_by_car_id.items():
+        cust_result = cust_by_id.get(rent.CustomerID)
+        rented_cols[car_id] = (
+            "Rented", "Yes", rent.CustomerID,
+            cust_result.Name if cust_result else "N/A (Deleted)",
+            date_str[rent.StartDate], date_str[rent.EndDate]
+        )
+
+    # วนรถรอบเดียว: แยกรถ Active, คำนวณ min/max/sum ของ DailyRate และเลือกคอลัมน์สถานะของแต่ละคันไปพร้อมกัน
+    active_cars = []
+    status_for = {}
+    rate_sum = 0.0
+    min_rate = float('inf')
+    max_rate = float('-inf')
+    for car in all_car_records:
+        if not car.IsActive:
+            status_for[car.ID] = _DELETED_COLS
+        else:
+            status_for[car.ID] = rented_cols.get(car.ID, _AVAILABLE_COLS)
+            active_cars.append(car)
+            rate = car.DailyRate
+            rate_sum += rate
+            if rate < min_rate:
+                min_rate = rate
+            if rate > max_rate:
+                max_rate = rate
     
     total_cars = len(all_car_records)
-    active_cars = [car for car in all_car_records if car['IsActive']]
     deleted_cars = total_cars - len(active_cars)
     currently_rented = len(rented_car_ids)
     available_now = len(active_cars) - currently_rented
     
-    rate_list = [car['DailyRate'] for car in active_cars]
-    min_rate = min(rate_list) if rate_list else 0.00
-    max_rate = max(rate_list) if rate_list else 0.00
-    avg_rate = sum(rate_list) / len(rate_list) if rate_list else 0.00
+    if not active_cars:
+        min_rate = max_rate = 0.00
+    avg_rate = rate_sum / len(active_cars) if active_cars else 0.00
     
-    cars_by_brand = {}
-    for car in all_car_records:
-        if car['IsActive'] and car['ID'] not in rented_car_ids:
-            full_model_name = car['Model'].strip() 
-            brand = full_model_name.split(' ')[0] 
-            cars_by_brand[brand] = cars_by_brand.get(brand, 0) + 1
+    cars_by_brand = Counter(
+        car.Model.strip().partition(' ')[0]
+        for car in active_cars if car.ID not in rented_car_ids
+    )
             
-    report_content = []
-    
-    title_line = "Detailed Rental Summary Report"
-    report_content.append("=" * 155)
-    report_content.append(f"{' ' * ((150 - len(title_line)) // 2)}{title_line}")
-    report_content.append("=" * 155)
-    report_content.append(f"Generated At : {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}") 
-    report_content.append(f"Endianness   : Little-Endian")
-    report_content.append(f"Time Zone    : +07:00 (Indochina Time)")
-    report_content.append(f"Encoding     : UTF-8 (fixed-length)")
-    report_content.append("-" * 155)
-    
-    fields = [
-        ('Car ID', 6), ('Model', 20), ('Plate', 12), ('Rate', 10), 
-        ('Status', 10), ('Rented', 8), 
-        ('Cust ID', 8), ('Name', 30), ('Start Date', 10), ('End Date', 10) 
-    ]
-    
-    header_line = ' | '.join(f"{name:<{length}}" for name, length in fields)
-    
-    report_content.append("ALL CARS DETAIL:") 
-    report_content.append(header_line)
-    report_content.append("-" * (sum(length for _, length in fields) + len(fields) * 3))
+    generated_at = _format_timestamp(datetime.datetime.now())
 
-    for car_data in all_car_records: 
-        car_id = car_data['ID']
-        car_model = car_data['Model'].strip('\x00')
-        car_plate = car_data.get('LicensePlate', 'N/A').strip('\x00')
-        car_rate = car_data.get('DailyRate', 0.00)
-        
-        cust_id_display = ""
-        cust_name = ""
-        start_date_display = ""
-        end_date_display = ""
-        rented_flag = "No" 
-
-        if not car_data['IsActive']:
-            car_status_text = "DELETED" 
-        elif car_id in rental_by_car_id:
-            rent = rental_by_car_id[car_id]
-            
-            cust_result = cust_mgr.get_record_by_id(rent['CustomerID'])
-            cust_name = cust_result[0]['Name'].strip('\x00') if cust_result else "N/A (Deleted)"
-            cust_id_display = rent['CustomerID']
-            
-            start_date_display = format_date_display(rent.get('StartDate', 0)) 
-            end_date_display = format_date_display(rent.get('EndDate', 0))
-            
-            car_status_text = "Rented" 
-            rented_flag = "Yes"
-            
-        else:
-            car_status_text = "Available"
-        
-        line_parts = [
-            f"{car_data['ID']:<6}",
-            f"{car_model:<20}",
-            f"{car_plate:<12}", 
-            f"{car_rate:,.2f}".ljust(10),
-            f"{car_status_text:<10}",
-            f"{rented_flag:<8}",
-            f"{cust_id_display:<8}" if cust_id_display else f"{'':<8}",
-            f"{cust_name:<30}" if cust_name else f"{'':<30}",
-            f"{start_date_display:<10}" if start_date_display else f"{'':<10}",
-            f"{end_date_display:<10}" if end_date_display else f"{'':<10}",
-        ]
-
-        report_content.append(' | '.join(line_parts))
+    # เขียนลงไฟล์ทีละบรรทัดระหว่างสร้าง (ใช้ buffer 1 MiB) แทนการเก็บทั้งรายงานไว้ในหน่วยความจำ
+    try:
+        with open(report_filename, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            write = f.write
+
+            write(_REPORT_HDR)
+            write(f"Generated At : {generated_at}\n")
+            write("Endianness   : Little-Endian\n")
+            write("Time Zone    : +07:00 (Indochina Time)\n")
+            write("Encoding     : UTF-8 (fixed-length)\n")
+            write(_SEP_DASH)
+
+            write("ALL CARS DETAIL:\n")
+            write(_DETAIL_HDR)
+
+            for car_data in all_car_records:
+                car_id = car_data.ID
+                write(DETAIL_ROW_FMT.format(
+                    car_id, car_data.Model, car_data.LicensePlate, car_data.DailyRate,
+                    *status_for[car_id]
+                ))
     
-    report_content.append("=" * 155)
-
-    report_content.append("\nSummary (ภาพรวมสถานะ Active)")
-    report_content.append(f"- Total Cars (records) : {total_cars}")
-    report_content.append(f"- Active Cars          : {len(active_cars)}")
-    report_content.append(f"- Deleted Cars         : {deleted_cars}")
-    report_content.append(f"- Currently Rented     : {currently_rented}")
-    report_content.append(f"- Available Now        : {available_now}")
+            write(_SEP_EQ)
+
+            write("\nSummary (ภาพรวมสถานะ Active)\n")
+            write(f"- Total Cars (records) : {total_cars}\n")
+            write(f"- Active Cars          : {len(active_cars)}\n")
+            write(f"- Deleted Cars         : {deleted_cars}\n")
+            write(f"- Currently Rented     : {currently_rented}\n")
+            write(f"- Available Now        : {available_now}\n")
     
-    report_content.append("\nRate Statistics (THB/day, Active only)")
-    report_content.append(f"- Min : {min_rate:,.2f}")
-    report_content.append(f"- Max : {max_rate:,.2f}")
-    report_content.append(f"- Avg : {avg_rate:,.2f}")
+            write("\nRate Statistics (THB/day, Active only)\n")
+            write(f"- Min : {min_rate:,.2f}\n")
+            write(f"- Max : {max_rate:,.2f}\n")
+            write(f"- Avg : {avg_rate:,.2f}\n")
     
-    report_content.append("\nCars by Brand (Available Only)")
-    if cars_by_brand:
-        for brand, count in cars_by_brand.items():
-            report_content.append(f"- {brand} : {count}")
-    else:
-        report_content.append("- None Available")
+            write("\nCars by Brand (Available Only)\n")
+            if cars_by_brand:
+                for brand, count in cars_by_brand.most_common():
+                    write(f"- {brand} : {count}\n")
+            else:
+                write("- None Available\n")
     
-    report_content.append("\n" + "=" * 155)
-
-    try:
-        with open(report_filename, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(report_content) + '\n')
+            write("\n" + _SEP_EQ)
         print(f"\n📄 รายงานสรุปละเอียดถูกสร้างสำเร็จที่ '{report_filename}'.")
     except IOError as e:
         print(f"❌ Error writing report file: {e}")
 
+@functools.lru_cache(maxsize=4096)
 def format_date_display(date_int: int) -> str: 
     """Converts DDMMYYYY (int) to DD-MM-YYYY (str) for display."""
-    date_str = str(date_int).zfill(8)
-    if date_str == '00000000':
+    if date_int == 0:
         return "N/A"
 
     try:
-        date_obj = datetime.datetime.strptime(date_str, '%d%m%Y')
-        return date_obj.strftime('%d-%m-%Y') 
+        _to_date(date_int)
+        return _format_ddmmyyyy(date_int)
     except ValueError:
         return "Invalid Date"
     
@@ -759,23 +1045,21 @@ def main():
 
     try:
         while True:
-            print("\n" + "="*50)
-            print("             ระบบจัดการเช่ารถยนต์ (MAIN MENU)")
-            print("="*50)
-            print("[1] จัดการข้อมูลรถยนต์")
-            print("[2] จัดการข้อมูลลูกค้า")
-            print("[3] จัดการสัญญาเช่า")
-            print("[R] สร้างรายงานรวมทั้งหมด (.txt)") 
-            print("[X] ออกจากระบบ (ปิดไฟล์)")
+            sys.stdout.write(_MAIN_MENU)
 
-            main_choice = get_user_choice(">> กรุณาเลือกเมนู: ", ['1', '2', '3', 'R', 'X']) 
+            main_choice = get_user_choice(">> กรุณาเลือกเมนู: ", _MAIN_CHOICES)
 
+            # ออกจากเมนูย่อยเมื่อไหร่ค่อย sync ทีเดียว แทนการ sync ทุกครั้งที่แก้ไขระเบียน
             if main_choice == '1':
                 run_car_menu(car_mgr)
+                car_mgr.sync()
             elif main_choice == '2':
                 run_customer_menu(cust_mgr)
+                cust_mgr.sync()
             elif main_choice == '3':
                 run_rental_menu(rental_mgr, car_mgr, cust_mgr)
+                rental_mgr.sync()
+                car_mgr.sync()
             elif main_choice == 'R':
                 generate_detailed_summary_report(
                     car_mgr,
@@ -806,6 +1090,11 @@ def main():
                 
     except Exception as e:
         print(f"\n❌ เกิดข้อผิดพลาดร้ายแรง: {e}")
+    finally:
+        # ออกด้วย Ctrl+C หรือ error ก็ต้อง close เพื่อตัดพื้นที่ที่จองเผื่อไว้ท้ายไฟล์ออก (truncate เหลือ _end)
+        # ไม่อย่างนั้นเปิดครั้งหน้าส่วนที่จองไว้จะกลายเป็นช่องว่างค้างอยู่ในไฟล์ถาวร; ที่ปิดไปแล้วตอนเลือก X จะไม่ทำอะไรซ้ำ
+        for mgr in (car_mgr, cust_mgr, rental_mgr):
+            mgr.close()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file